@@ -2,33 +2,45 @@ import tkinter as tk
 from tkinter import colorchooser
 import json
 import os
+import queue
+import threading
+
+# Use orjson (a fast native JSON implementation) when available; fall back to
+# the stdlib so the app still runs with no dependencies installed. orjson's
+# JSONDecodeError subclasses json.JSONDecodeError, so the except clauses
+# below work with either.
+try:
+    import orjson
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode()
+    json_loads = orjson.loads
+except ImportError:
+    json_dumps = json.dumps
+    json_loads = json.loads
 from datetime import datetime
-import hashlib, colorsys
-import math
+import zlib, colorsys
+from functools import lru_cache
 import vis
 
 # --- Unique Color Generation ---
-project_color_cache = {}
-
+@lru_cache(maxsize=1024)
 def get_color(project_name):
     """
     Generate a unique color for each project based on its name.
-    Uses MD5 to compute a hash, then converts a portion of the hash into an HSV color.
+    Uses CRC32 for a stable, cheap hash, then converts it into an HSV color.
     """
-    if project_name in project_color_cache:
-        return project_color_cache[project_name]
-    hash_val = int(hashlib.md5(project_name.encode()).hexdigest(), 16)
-    hue = (hash_val % 360) / 360.0
+    hue = (zlib.crc32(project_name.encode()) % 360) / 360.0
     saturation = 0.6
     value = 0.9
     r, g, b = colorsys.hsv_to_rgb(hue, saturation, value)
-    project_color_cache[project_name] = (r, g, b)
     return (r, g, b)
 
+@lru_cache(maxsize=512)
 def rgb_to_hex(rgb):
     """Convert an (r, g, b) tuple to a hex color string."""
     return '#{0:02x}{1:02x}{2:02x}'.format(int(rgb[0]*255), int(rgb[1]*255), int(rgb[2]*255))
 
+@lru_cache(maxsize=512)
 def get_contrasting_text_color(bg_hex):
     """Return white or black text depending on the brightness of the background color."""
     r = int(bg_hex[1:3], 16)
@@ -38,20 +50,62 @@ def get_contrasting_text_color(bg_hex):
     return "white" if brightness < 128 else "black"
 
 # --- History Logging Setup ---
-LOG_FILE = "history.json"
-if os.path.exists(LOG_FILE):
+LOG_FILE = "history.ndjson"
+OLD_LOG_FILE = "history.json"
+
+def migrate_history():
+    """One-shot migration: rewrite the old JSON-array log as newline-delimited JSON."""
+    if os.path.exists(LOG_FILE) or not os.path.exists(OLD_LOG_FILE):
+        return
+    try:
+        with open(OLD_LOG_FILE, "r") as f:
+            old_events = json_loads(f.read())
+    except json.JSONDecodeError:
+        return
+    with open(LOG_FILE, "w") as f:
+        for event in old_events:
+            f.write(json_dumps(event) + "\n")
+
+def load_history():
+    """Load the switch history from the NDJSON log, one event per line."""
+    if not os.path.exists(LOG_FILE):
+        return []
     try:
         with open(LOG_FILE, "r") as f:
-            history = json.load(f)
+            return [json_loads(line) for line in f if line.strip()]
     except json.JSONDecodeError:
-        history = []
-else:
-    history = []
+        return []
 
-def save_history():
-    """Save the switch history to a JSON file."""
-    with open(LOG_FILE, "w") as f:
-        json.dump(history, f, indent=4)
+migrate_history()
+history = load_history()
+
+# Last project actually written to the log; used to suppress duplicate
+# entries (e.g. re-selecting the project restored from history).
+_last_logged_project = history[-1]["project"] if history else None
+
+# History writes happen on a background thread so a button click never
+# blocks on file I/O; end_day() drains the queue before exiting.
+_write_queue = queue.Queue()
+
+def _history_writer():
+    while True:
+        event = _write_queue.get()
+        try:
+            with open(LOG_FILE, "a", buffering=1) as f:
+                f.write(json_dumps(event) + "\n")
+        except Exception as e:
+            # A failed write (disk full, permissions, ...) must not kill the
+            # thread or leave the queue un-drained: end_day() joins the queue
+            # and would otherwise block forever.
+            print(f"Failed to write history event: {e}")
+        finally:
+            _write_queue.task_done()
+
+threading.Thread(target=_history_writer, daemon=True, name="history-writer").start()
+
+def append_event(event):
+    """Queue a switch event for the background writer thread."""
+    _write_queue.put(event)
 
 # --- Project Switching ---
 current_project = None
@@ -59,11 +113,12 @@ project_start_time = None  # Records the time when the current project was start
 
 def switch_project(project, color_override=None):
     """Switch projects and log the switch event if it's a change."""
-    global current_project, project_start_time
+    global current_project, project_start_time, _last_logged_project
     if project == current_project:
         return
+    now = datetime.now()  # single clock read: start time and timestamp match
     current_project = project
-    project_start_time = datetime.now()  # Record the start time for this project
+    project_start_time = now
 
     if project == "END_OF_DAY":
         color = "#ff6666"  # a slightly brighter red for visibility on dark bg
@@ -72,77 +127,140 @@ def switch_project(project, color_override=None):
     else:
         color = rgb_to_hex(get_color(project))
     event = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "project": project,
         "color": color
     }
-    history.append(event)
-    save_history()
+    # Only write when this would not duplicate the last logged entry.
+    if project != _last_logged_project:
+        history.append(event)
+        append_event(event)
+        _last_logged_project = project
     status_label.config(text=f"Current project: {project}")
+    # Refresh the details label right away rather than waiting for the
+    # next scheduled minute-boundary update.
+    if _details_after_id is not None:
+        root.after_cancel(_details_after_id)
+        update_details()
 
 def end_day():
     """Log the END_OF_DAY event and quit the application."""
     switch_project("END_OF_DAY")
+    _write_queue.join()  # make sure the final event hits the disk
     root.destroy()
     vis.visualiser()
     
 # --- Jobs File Setup ---
 JOBS_FILE = "jobs.json"
+_jobs_cache = None
+_jobs_mtime = 0
 
 def load_jobs():
+    global _jobs_cache, _jobs_mtime
     default_job_list = [{"name": "Job1", "color": rgb_to_hex(get_color("Job1"))},
                         {"name": "Job2", "color": rgb_to_hex(get_color("Job2"))}]
     """
     Load the list of jobs from jobs.json.
-    Each job is a dict with keys "name" and "color".
+    Each job is a dict with keys "name", "color" and a precomputed "fg" text color.
+    The parsed list is cached and only re-read when the file's mtime changes.
     If the file is missing or invalid, return a default list.
     """
+    mtime = 0
     if os.path.exists(JOBS_FILE):
+        mtime = os.stat(JOBS_FILE).st_mtime
+        if _jobs_cache is not None and mtime == _jobs_mtime:
+            return _jobs_cache
         try:
-            jobs = json.load(open(JOBS_FILE))
+            jobs = json_loads(open(JOBS_FILE).read())
             new_jobs = []
             for j in jobs:
                 if isinstance(j, dict) and "name" in j and "color" in j:
                     new_jobs.append(j)
                 elif isinstance(j, str):
                     new_jobs.append({"name": j, "color": rgb_to_hex(get_color(j))})
-            return new_jobs if new_jobs else default_job_list
+            jobs = new_jobs if new_jobs else default_job_list
         except json.JSONDecodeError:
-            return default_job_list
+            jobs = default_job_list
     else:
-        return default_job_list
+        jobs = default_job_list
+    for job in jobs:
+        job["fg"] = get_contrasting_text_color(job["color"])
+    _jobs_cache = jobs
+    _jobs_mtime = mtime
+    return jobs
 
 def save_jobs(jobs):
-    """Save the list of job dictionaries to jobs.json."""
-    with open(JOBS_FILE, "w") as f:
-        json.dump(jobs, f, indent=4)
+    """
+    Save the list of job dictionaries to jobs.json and invalidate the cache.
+    Skips the write when the serialized bytes already match the file on disk,
+    and otherwise replaces it atomically via a temp file.
+    """
+    global _jobs_mtime
+    data = json.dumps(jobs, indent=4)
+    if os.path.exists(JOBS_FILE):
+        try:
+            with open(JOBS_FILE, "r") as f:
+                if f.read() == data:
+                    return
+        except OSError:
+            pass
+    tmp_file = JOBS_FILE + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write(data)
+    os.replace(tmp_file, JOBS_FILE)
+    _jobs_mtime = 0
+
+# Pool of job buttons reused across redraws; reconfiguring a Tk widget in
+# place is much cheaper than destroying and recreating it.
+BUTTON_FONT = ("Helvetica", 16)
+_job_buttons = []
+_grid_shape = (0, 0)
 
 def update_job_buttons():
-    """Clear and repopulate the grid of job buttons based on the current jobs list."""
-    for widget in job_frame.winfo_children():
-        widget.destroy()
+    """Repopulate the grid of job buttons, reusing existing widgets where possible."""
+    global _grid_shape
     jobs = load_jobs()
     num_jobs = len(jobs)
-    
-    # Determine the number of columns based on the square root of the number of jobs.
-    cols = math.ceil(math.sqrt(num_jobs)) if num_jobs > 0 else 1
-    rows_count = math.ceil(num_jobs / cols)
-    
-    # Configure grid weights so buttons expand equally.
-    for r in range(rows_count):
-        job_frame.rowconfigure(r, weight=1)
-    for c in range(cols):
-        job_frame.columnconfigure(c, weight=1)
-    
+
+    # Determine the number of columns based on the square root of the number
+    # of jobs, using integer arithmetic instead of math.ceil/math.sqrt.
+    if num_jobs > 0:
+        cols = int(num_jobs ** 0.5)
+        cols += (cols * cols < num_jobs)
+    else:
+        cols = 1
+    rows_count = (num_jobs + cols - 1) // cols
+
+    # Configure grid weights so buttons expand equally. Each configure call
+    # is a Tcl round-trip, so only the rows/columns that appeared (weight 1)
+    # or disappeared (back to weight 0) since the last redraw are touched.
+    prev_rows, prev_cols = _grid_shape
+    if (rows_count, cols) != _grid_shape:
+        for r in range(prev_rows, rows_count):
+            job_frame.rowconfigure(r, weight=1)
+        for r in range(rows_count, prev_rows):
+            job_frame.rowconfigure(r, weight=0)
+        for c in range(prev_cols, cols):
+            job_frame.columnconfigure(c, weight=1)
+        for c in range(cols, prev_cols):
+            job_frame.columnconfigure(c, weight=0)
+        _grid_shape = (rows_count, cols)
+
+    # Grow the pool only when there are more jobs than buttons.
+    while len(_job_buttons) < num_jobs:
+        _job_buttons.append(tk.Button(job_frame, font=BUTTON_FONT))
+
     for i, job in enumerate(jobs):
-        row = i // cols
-        col = i % cols
-        fg_color = get_contrasting_text_color(job["color"])
-        btn = tk.Button(job_frame, text=job["name"], font=("Helvetica", 16),
-                        bg=job["color"], fg=fg_color,
-                        command=lambda j=job: switch_project(j["name"], j["color"]))
+        row, col = divmod(i, cols)
+        btn = _job_buttons[i]
+        btn.configure(text=job["name"], bg=job["color"], fg=job["fg"],
+                      command=lambda j=job: switch_project(j["name"], j["color"]))
         btn.grid(row=row, column=col, sticky="nsew", padx=5, pady=5)
 
+    # Hide (don't destroy) leftover buttons from a previously larger layout.
+    for btn in _job_buttons[num_jobs:]:
+        btn.grid_forget()
+
 # --- Edit Jobs Window with Color Chooser, Add & Remove ---
 def edit_jobs():
     """Open a window to add, remove, and edit jobs (name and color)."""
@@ -220,8 +338,11 @@ def edit_jobs():
         if not new_jobs:
             new_jobs = [{"name": "Falcon", "color": rgb_to_hex(get_color("Falcon"))},
                         {"name": "Toyota", "color": rgb_to_hex(get_color("Toyota"))}]
-        save_jobs(new_jobs)
-        update_job_buttons()
+        # Skip the rewrite and redraw entirely when nothing changed.
+        old_jobs = [(j["name"], j["color"]) for j in load_jobs()]
+        if [(j["name"], j["color"]) for j in new_jobs] != old_jobs:
+            save_jobs(new_jobs)
+            update_job_buttons()
         edit_window.destroy()
     
     save_button = tk.Button(buttons_frame, text="Save", font=("Helvetica", 12), 
@@ -288,18 +409,29 @@ if history and history[-1]["project"] != "END_OF_DAY":
         project_start_time = datetime.now()
     status_label.config(text=f"Current project: {current_project}")
 
-# Function to update the start time and duration label in real time.
+# Function to update the start time and duration label.
+# The display only has minute resolution, so instead of redrawing every
+# second we wake up at the next minute boundary.
+_last_details = None
+_details_after_id = None
+
 def update_details():
+    global _last_details, _details_after_id
+    now = datetime.now()
     if current_project and project_start_time and current_project != "END_OF_DAY":
         start_time_str = project_start_time.strftime("%I:%M%p").lower()
-        delta = datetime.now() - project_start_time
+        delta = now - project_start_time
         hours = delta.seconds // 3600
         minutes = (delta.seconds % 3600) // 60
         details = f"Start Time: {start_time_str}\nDuration: {hours}hrs {minutes}mins"
     else:
         details = ""
-    details_label.config(text=details)
-    root.after(1000, update_details)
+    # Skip the Tcl round-trip when the text hasn't changed.
+    if details != _last_details:
+        details_label.config(text=details)
+        _last_details = details
+    ms_to_next_minute = (60 - now.second) * 1000 - now.microsecond // 1000
+    _details_after_id = root.after(ms_to_next_minute, update_details)
 
 # Start updating the details label.
 update_details()
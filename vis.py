@@ -2,137 +2,193 @@
 
 import json
 import os
-from datetime import datetime, timedelta
+import pickle
+import re
+from datetime import datetime
+from itertools import groupby
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import PatchCollection
 from matplotlib.patches import Rectangle
 
+# Same optional-orjson arrangement as main.py: fast native JSON when
+# installed, stdlib otherwise.
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Matches a non-zero-padded hour ("...T9:30:00") so it can be fixed before
+# parsing instead of catching ValueError from fromisoformat per event.
+_HOUR_FIX = re.compile(r"T(\d):")
+
+def _compute_geometry(start_s, end_s, day_start_s):
+    """
+    Compute per-session rectangle geometry from int64 seconds-since-epoch
+    arrays: hours-from-midnight, duration, and the extent of the past-7PM
+    outline. Written as a plain numeric loop so Numba can compile it to
+    native code when available (see below).
+    """
+    n = start_s.shape[0]
+    start_hour = np.empty(n, dtype=np.float64)
+    end_hour = np.empty(n, dtype=np.float64)
+    duration = np.empty(n, dtype=np.float64)
+    outline_start = np.empty(n, dtype=np.float64)
+    outline_dur = np.empty(n, dtype=np.float64)
+    needs_outline = np.empty(n, dtype=np.bool_)
+    for i in range(n):
+        sh = (start_s[i] - day_start_s[i]) / 3600.0
+        eh = (end_s[i] - day_start_s[i]) / 3600.0
+        start_hour[i] = sh
+        end_hour[i] = eh
+        duration[i] = eh - sh
+        needs_outline[i] = eh > 19.0
+        clamped = sh if sh > 19.0 else 19.0
+        outline_start[i] = clamped
+        outline_dur[i] = eh - clamped
+    return start_hour, end_hour, duration, outline_start, outline_dur, needs_outline
+
+# Numba is optional: when installed the kernel is compiled (and cached on
+# disk) for a large speedup on long histories; otherwise the pure-Python
+# loop above runs as-is.
+if numba is not None:
+    _compute_geometry = numba.njit(cache=True)(_compute_geometry)
+
+def _format_time(hour_float):
+    total_minutes = int(round(hour_float * 60))
+    if total_minutes >= 1440:
+        return "12:00 AM"
+    dt_temp = datetime(2000, 1, 1, total_minutes // 60, total_minutes % 60)
+    return dt_temp.strftime("%I:%M %p").lstrip("0")
+
+# Y-axis ticks every 30 minutes over 24 hours. The tick set is fixed, so the
+# label table is built once at import time instead of on every invocation.
+Y_TICKS = [i/2 for i in range(0, 49)]
+Y_LABELS = [_format_time(t) for t in Y_TICKS]
+
 def visualiser():
-    HISTORY_FILE = "history.json"
+    HISTORY_FILE = "history.ndjson"
+    CACHE_FILE = "history.cache.pkl"
 
     if not os.path.exists(HISTORY_FILE):
         print(f"File '{HISTORY_FILE}' not found.")
         return
 
-    with open(HISTORY_FILE, "r") as f:
+    # The derived session arrays are cached next to the log, keyed by its
+    # mtime, so reopening the visualiser without new switches skips the
+    # parse/build work entirely.
+    log_mtime = os.stat(HISTORY_FILE).st_mtime
+    sessions = None
+    if os.path.exists(CACHE_FILE):
         try:
-            events = json.load(f)
-        except json.JSONDecodeError:
-            print("Error: The file is not valid JSON.")
-            return
-
-    if not events:
-        print("No events found in history.")
-        return
+            with open(CACHE_FILE, "rb") as f:
+                cached_mtime, cached_sessions = pickle.load(f)
+            if cached_mtime == log_mtime:
+                sessions = cached_sessions
+        except (pickle.PickleError, EOFError, OSError, ValueError):
+            sessions = None
+
+    if sessions is None:
+        with open(HISTORY_FILE, "r") as f:
+            try:
+                events = [json_loads(line) for line in f if line.strip()]
+            except json.JSONDecodeError:
+                print("Error: The file is not valid NDJSON.")
+                return
 
-    # Sort events by timestamp.
-    events.sort(key=lambda e: e.get("timestamp"))
+        if not events:
+            print("No events found in history.")
+            return
 
-    def parse_event(event):
-        """Convert an event's timestamp to a datetime, fixing non-padded hour if necessary."""
-        ts = event["timestamp"]
-        try:
-            return datetime.fromisoformat(ts)
-        except ValueError:
-            # If the hour is not zero-padded, fix it.
-            try:
-                date_part, time_part = ts.split("T")
-                if len(time_part) > 0 and time_part[1] == ":":
-                    time_part = "0" + time_part
-                fixed_ts = f"{date_part}T{time_part}"
-                return datetime.fromisoformat(fixed_ts)
-            except Exception as e:
-                print("Error parsing timestamp:", ts)
-                raise e
-
-    def day_end(dt):
-        """Return midnight (the start of the next day) for the given datetime dt."""
-        return datetime.combine(dt.date() + timedelta(days=1), datetime.min.time())
-
-    # --- Build Sessions ---
-    # Each session is built from one event (using its stored color) to the next.
-    # The session tuple is (start, end, project, color).
-    sessions = []
-    for i in range(len(events) - 1):
-        current = parse_event(events[i])
-        next_event = parse_event(events[i+1])
-        project = events[i].get("project", "Unknown")
-        color = events[i].get("color", "#cccccc")
-        if current.date() == next_event.date():
-            end = next_event
-        else:
-            end = day_end(current)
-        sessions.append((current, end, project, color))
-
-    # For the final event overall, extend its session for just one hour,
-    # unless its project name contains 'END_OF_DAY', in which case use zero duration.
-    final_event = parse_event(events[-1])
-    final_project = events[-1].get("project", "Unknown")
-    final_color = events[-1].get("color", "#cccccc")
-    if "END_OF_DAY" in final_project:
-        final_end = final_event  # zero duration
-    else:
-        final_end = final_event + timedelta(hours=1)
-    sessions.append((final_event, final_end, final_project, final_color))
-
-    def split_session_by_day(start, end, project, color):
-        """
-        Splits a session into parts that do not span midnight.
-        Returns a list of (start, end, project, color) tuples.
-        """
-        splits = []
-        current = start
-        while current.date() < end.date():
-            next_midnight = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
-            splits.append((current, next_midnight, project, color))
-            current = next_midnight
-        if current < end:
-            splits.append((current, end, project, color))
-        return splits
-
-    # --- Split Sessions That Cross Midnight ---
-    sessions_split = []
-    for start, end, project, color in sessions:
-        if start.date() == end.date():
-            sessions_split.append((start, end, project, color))
+        # Normalize non-zero-padded hours in one pass, then sort by the now
+        # lexically ordered timestamps. The regex cannot match a padded
+        # "T09:", so running it on every timestamp is safe and cheap.
+        for e in events:
+            e["timestamp"] = _HOUR_FIX.sub(r"T0\1:", e["timestamp"], count=1)
+        events.sort(key=lambda e: e.get("timestamp"))
+
+        # --- Build Sessions (vectorized) ---
+        # Parse each timestamp exactly once into a datetime64[s] array; all the
+        # session arithmetic below then runs as whole-array NumPy operations
+        # instead of per-event Python loops.
+        starts = np.array([datetime.fromisoformat(e["timestamp"]) for e in events],
+                          dtype="datetime64[s]")
+        projects = [e.get("project", "Unknown") for e in events]
+        colors = [e.get("color", "#cccccc") for e in events]
+
+        # Each session runs from its event to the next one. The final session is
+        # extended by one hour, unless it is an END_OF_DAY marker (zero duration).
+        ends = np.empty_like(starts)
+        ends[:-1] = starts[1:]
+        if "END_OF_DAY" in projects[-1]:
+            ends[-1] = starts[-1]
         else:
-            sessions_split.extend(split_session_by_day(start, end, project, color))
-
-    # --- Group Sessions By Day ---
-    sessions_by_day = {}
-    for start, end, project, color in sessions_split:
-        day_str = start.date().isoformat()
-        sessions_by_day.setdefault(day_str, []).append((start, end, project, color))
+            ends[-1] = starts[-1] + np.timedelta64(1, "h")
+
+        # Clamp sessions that cross midnight to the end of their start day, so a
+        # session ending at (or past) midnight renders with end_hour == 24.0.
+        day_starts = starts.astype("datetime64[D]")
+        crosses_midnight = ends.astype("datetime64[D]") != day_starts
+        ends = np.where(crosses_midnight,
+                        (day_starts + np.timedelta64(1, "D")).astype("datetime64[s]"),
+                        ends)
+
+        # Hours-from-midnight and outline geometry for every session, computed
+        # in one pass over int64 seconds views of the datetime arrays.
+        (start_hours, end_hours, durations,
+         outline_starts, outline_durs, needs_outline) = _compute_geometry(
+            starts.view("int64"), ends.view("int64"),
+            day_starts.astype("datetime64[s]").view("int64"))
+
+        sessions = (day_starts.astype(str), start_hours, durations,
+                    outline_starts, outline_durs, needs_outline,
+                    projects, colors)
+        try:
+            with open(CACHE_FILE, "wb") as f:
+                pickle.dump((log_mtime, sessions), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
 
-    # Sorted list of days (each becomes a column).
-    days = sorted(sessions_by_day.keys())
+    (day_labels, start_hours, durations, outline_starts, outline_durs,
+     needs_outline, projects, colors) = sessions
 
     # --- Plotting ---
     fig, ax = plt.subplots(figsize=(16, 10))
 
-    for i, day in enumerate(days):
-        for start, end, project, color in sessions_by_day[day]:
-            # Compute the start time in hours from midnight.
-            start_hour = start.hour + start.minute/60 + start.second/3600
-            # If the session was extended past midnight, treat its end as 24.0.
-            if end.date() != start.date():
-                end_hour = 24.0
-            else:
-                end_hour = end.hour + end.minute/60 + end.second/3600
-            duration = end_hour - start_hour
-            rect = Rectangle((i - 0.4, start_hour), 0.8, duration,
-                             facecolor=color, edgecolor="black", alpha=0.7)
-            ax.add_patch(rect)
+    # Collect the rectangles and add them as single collections, so matplotlib
+    # draws one batched artist per layer instead of one artist per session.
+    rects = []
+    rect_colors = []
+    outline_rects = []
+    # Sessions are already chronological, so groupby streams one day-group
+    # (column) at a time — no per-session hashing and no final sort.
+    days = []
+    for col, (day, group) in enumerate(groupby(range(len(day_labels)),
+                                               key=day_labels.__getitem__)):
+        days.append(day)
+        for i in group:
+            rects.append(Rectangle((col - 0.4, start_hours[i]), 0.8, durations[i]))
+            rect_colors.append(colors[i])
             # Add a label if the rectangle is tall enough.
-            if duration >= 0.2:
-                ax.text(i, start_hour + duration/2, project,
+            if durations[i] >= 0.2:
+                ax.text(col, start_hours[i] + durations[i]/2, projects[i],
                         ha="center", va="center", fontsize=9, color="black")
             # If any portion of the booking extends past 7 PM (19.0), draw an outline on that part.
-            if end_hour > 19:
-                outline_start = max(start_hour, 19)
-                outline_duration = end_hour - outline_start
-                outline_rect = Rectangle((i - 0.4, outline_start), 0.8, outline_duration,
-                                         facecolor="none", edgecolor="red", linewidth=2)
-                ax.add_patch(outline_rect)
+            if needs_outline[i]:
+                outline_rects.append(Rectangle((col - 0.4, outline_starts[i]), 0.8,
+                                               outline_durs[i]))
+
+    ax.add_collection(PatchCollection(rects, facecolors=rect_colors,
+                                      edgecolors="black", alpha=0.7))
+    if outline_rects:
+        ax.add_collection(PatchCollection(outline_rects, facecolors="none",
+                                          edgecolors="red", linewidths=2))
 
     # Configure x-axis (one column per day).
     ax.set_xticks(range(len(days)))
@@ -146,16 +202,8 @@ def visualiser():
     ax.set_title("Timesheet Visualisation")
 
     # Y-axis ticks every 30 minutes.
-    y_ticks = [i/2 for i in range(0, 49)]
-    def format_time(hour_float):
-        total_minutes = int(round(hour_float * 60))
-        if total_minutes >= 1440:
-            return "12:00 AM"
-        dt_temp = datetime(2000, 1, 1, total_minutes // 60, total_minutes % 60)
-        return dt_temp.strftime("%I:%M %p").lstrip("0")
-    y_labels = [format_time(t) for t in y_ticks]
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_labels)
+    ax.set_yticks(Y_TICKS)
+    ax.set_yticklabels(Y_LABELS)
 
     ax.grid(True, axis="y", linestyle="--", alpha=0.7)
     fig.subplots_adjust(left=0.1, right=0.95, top=0.95, bottom=0.1)